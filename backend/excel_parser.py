@@ -0,0 +1,100 @@
+# Workbook parsing for /admin/upload. Kept free of app state: spawned worker
+# processes import this module to unpickle parse_sheet, so it must stay cheap to import.
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional
+from xml.etree import ElementTree
+import zipfile
+
+import openpyxl
+
+XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+PASS_GRADES = frozenset({"O", "A+", "A", "B+", "B", "C"})
+
+SUBJECT_KEYS = [
+    (f"subjectsemester{i}", f"subjectcode{i}", f"subjectgrade{i}")
+    for i in range(1, 26)
+]
+
+@lru_cache(maxsize=64)
+def get_result_status(grade: str) -> str:
+    return "Pass" if grade.upper() in PASS_GRADES else "Fail"
+
+def _cell(row: tuple, i: Optional[int]):
+    return row[i] if i is not None and i < len(row) else None
+
+def sheet_names(path: str) -> List[str]:
+    # only the workbook part; load_workbook would also parse the shared-strings table
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    return [sheet.get("name") for sheet in root.iter(f"{{{XLSX_NS}}}sheet")]
+
+def parse_sheet(path: str, sheet: str) -> List[dict]:
+    # runs in a worker process (or a thread for single-sheet workbooks); read_only streams rows
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    students = []
+
+    try:
+        ws = workbook[sheet]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return students
+
+        raw_headers = [str(c).strip().lower() for c in header]
+        # resolve column positions once per sheet, rows are read by index
+        idx = {h: i for i, h in enumerate(raw_headers)}
+        roll_i, name_i, dob_i, course_i = (
+            idx.get(k) for k in ("rollno", "name", "dob", "course")
+        )
+        subject_idx = [
+            (idx.get(sem_k), idx.get(code_k), idx.get(grade_k))
+            for sem_k, code_k, grade_k in SUBJECT_KEYS
+        ]
+
+        for row in rows:
+            if not row or not row[0]:
+                continue
+
+            # 🔹 DOB FIX (dd/mm/yyyy handled)
+            dob = _cell(row, dob_i)
+            if isinstance(dob, (int, float)):
+                dob = (datetime(1899, 12, 30) + timedelta(days=int(dob))).strftime("%Y-%m-%d")
+            elif isinstance(dob, datetime):
+                dob = dob.strftime("%Y-%m-%d")
+            elif isinstance(dob, str):
+                dob = dob.strip()
+                try:
+                    dob = datetime.strptime(dob, "%d/%m/%Y").strftime("%Y-%m-%d")
+                except ValueError:
+                    dob = dob
+            else:
+                dob = ""
+
+            subjects = []
+            for sem_i, code_i, grade_i in subject_idx:
+                sem = _cell(row, sem_i)
+                code = _cell(row, code_i)
+                grade = _cell(row, grade_i)
+
+                if sem and code and grade:
+                    subjects.append({
+                        "semester": str(sem),
+                        "code": str(code),
+                        "grade": str(grade),
+                        "status": get_result_status(str(grade))
+                    })
+
+            students.append({
+                "rollNo": str(_cell(row, roll_i)),
+                "name": str(_cell(row, name_i)),
+                "dob": dob,
+                "course": str(_cell(row, course_i)),
+                "subjects": subjects
+            })
+    finally:
+        workbook.close()
+
+    return students
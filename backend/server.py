@@ -1,17 +1,33 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
+import asyncio
+import multiprocessing
 import logging
 from pathlib import Path
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional
 from datetime import datetime, timezone, timedelta
-from jose import jwt, JWTError
+import jwt
+from jwt import PyJWTError
 from twilio.rest import Client
-import openpyxl
-import io
+from cachetools import TTLCache
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+import hashlib
+import hmac
+import orjson
+import shutil
+import tempfile
+
+from excel_parser import get_result_status, parse_sheet, sheet_names
 
 # =====================
 # ENV SETUP
@@ -22,27 +38,55 @@ load_dotenv(ROOT_DIR / ".env")
 
 MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME")
-
-client = AsyncIOMotorClient(MONGO_URL)
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "zstd,snappy")
+
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=20,
+    minPoolSize=5,
+    serverSelectionTimeoutMS=2000,
+    retryWrites=True,
+    compressors=MONGO_COMPRESSORS,
+)
 db = client[DB_NAME]
 
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# short timeouts so a slow Redis degrades to a cache miss instead of stalling requests
+redis_client = redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
 TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN", "")
 TWILIO_VERIFY_SID = os.environ.get("TWILIO_VERIFY_SID", "")
 ADMIN_PHONE = os.environ.get("ADMIN_PHONE", "")
 
+twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID else None
+
 ADMIN_USER = os.environ.get("ADMIN_USER", "admin")
 ADMIN_PASS = os.environ.get("ADMIN_PASS", "12345")
 
 SECRET_KEY = os.environ.get("SESSION_SECRET", "change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+OTP_SESSION_EXPIRE_SECONDS = 600
+RESULT_CACHE_EXPIRE_SECONDS = 300
+MAX_BATCH_SIZE = 10
+
+BULK_WRITE_BATCH_SIZE = 1000
+UPLOAD_CHUNK_SIZE = 1 << 20
+XLSX_MAGIC = b"PK\x03\x04"
+# worker processes per uvicorn worker; each holds a parsed sheet in memory
+EXCEL_WORKERS = int(os.environ.get("EXCEL_WORKERS", "2"))
+
+STUDENT_LOOKUP_INDEX = [("rollNo", 1), ("dob", 1)]
+STUDENT_RESULT_PROJECTION = {
+    "_id": 0, "rollNo": 1, "name": 1, "course": 1, "dob": 1, "subjects": 1
+}
 
 # =====================
 # APP SETUP
 # =====================
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 app.add_middleware(
@@ -56,7 +100,10 @@ app.add_middleware(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-pending_otp_sessions = {}
+excel_executor: Optional[ProcessPoolExecutor] = None
+
+# Decoded JWT payloads keyed by sha256(token), so repeat calls skip HMAC + JSON
+_token_cache = TTLCache(maxsize=1024, ttl=30)
 
 # =====================
 # MODELS
@@ -82,25 +129,98 @@ class LoginRequest(BaseModel):
 class OTPVerifyRequest(BaseModel):
     code: str
 
+class BatchSubRequest(BaseModel):
+    method: str
+    url: str
+    body: Optional[dict] = None
+    query: Optional[Dict[str, Optional[str]]] = None
+
 # =====================
 # HELPERS
 # =====================
 
-def get_result_status(grade: str) -> str:
-    pass_grades = ["O", "A+", "A", "B+", "B", "C"]
-    return "Pass" if grade.upper() in pass_grades else "Fail"
-
 def create_access_token(data: dict, expires: int = 15):
     payload = data.copy()
     payload["exp"] = datetime.now(timezone.utc) + timedelta(minutes=expires)
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str):
+    if not token:
+        return None
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        # the cache TTL can outlive the token itself, so re-check exp
+        if payload.get("exp", 0) > datetime.now(timezone.utc).timestamp():
+            return payload
+        _token_cache.pop(key, None)
+        return None
+
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except PyJWTError:
         return None
 
+    _token_cache[key] = payload
+    return payload
+
+def get_twilio_client() -> Client:
+    global twilio_client
+    if twilio_client is None:
+        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return twilio_client
+
+def result_cache_key(roll_no: str) -> str:
+    # keyed by roll only so a save can invalidate it without knowing the old dob
+    return f"result:{roll_no}"
+
+def result_response(student: dict) -> dict:
+    return {
+        "rollNo": student["rollNo"],
+        "name": student["name"],
+        "course": student["course"],
+        "dob": student["dob"],
+        "results": student.get("subjects", [])
+    }
+
+async def get_cached_result(roll_no: str, dob: str) -> Optional[bytes]:
+    # stored as b"<dob>\0<json body>", so a hit returns the body without decode + re-encode
+    try:
+        cached = await redis_client.get(result_cache_key(roll_no))
+    except RedisError as e:
+        logger.warning(f"Result cache read failed: {e}")
+        return None
+
+    if cached is None:
+        return None
+    cached_dob, _, body = cached.partition(b"\0")
+    return body if cached_dob == dob.encode() else None
+
+async def cache_result(student: dict):
+    # reads only fill an empty slot (nx), so they never overwrite what a save just invalidated
+    value = student["dob"].encode() + b"\0" + orjson.dumps(result_response(student))
+    try:
+        await redis_client.set(
+            result_cache_key(student["rollNo"]), value,
+            ex=RESULT_CACHE_EXPIRE_SECONDS, nx=True
+        )
+    except RedisError as e:
+        logger.warning(f"Result cache write failed: {e}")
+
+async def invalidate_results(roll_nos: List[str]):
+    # writes delete rather than rewrite, so two concurrent saves can't leave the older body cached
+    try:
+        await redis_client.delete(*[result_cache_key(roll_no) for roll_no in roll_nos])
+    except RedisError as e:
+        logger.error(f"Result cache invalidation failed, entries may be stale for up to {RESULT_CACHE_EXPIRE_SECONDS}s: {e}")
+
+def request_token(token: Optional[str] = None, authorization: Optional[str] = Header(None)) -> Optional[str]:
+    # Authorization: Bearer is preferred; ?token= stays for existing clients
+    if authorization and authorization[:7].lower() == "bearer ":
+        return authorization[7:]
+    return token
+
 async def get_current_admin(token: str):
     payload = verify_token(token)
     if not payload or not payload.get("is_admin"):
@@ -115,9 +235,18 @@ async def get_current_admin(token: str):
 async def root():
     return {"message": "College Result Portal API"}
 
+@api_router.get("/health")
+async def health():
+    return {"status": "ok"}
+
 @api_router.post("/login")
 async def admin_login(req: LoginRequest):
-    if req.username != ADMIN_USER or req.password != ADMIN_PASS:
+    # compare both fields in constant time, & so neither check short-circuits
+    ok = (
+        hmac.compare_digest(req.username.encode(), ADMIN_USER.encode())
+        & hmac.compare_digest(req.password.encode(), ADMIN_PASS.encode())
+    )
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_VERIFY_SID, ADMIN_PHONE]):
@@ -127,47 +256,65 @@ async def admin_login(req: LoginRequest):
         )
         return {"otp_required": False, "token": token}
 
+    # store the session before texting the code, so an OTP is never sent without one to redeem
+    session_id = create_access_token({"pending_otp": True}, 10)
     try:
-        twilio = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        twilio.verify.v2.services(TWILIO_VERIFY_SID).verifications.create(
-            to=ADMIN_PHONE, channel="sms"
-        )
-
-        session_id = create_access_token({"pending_otp": True}, 10)
-        pending_otp_sessions[session_id] = req.username
+        await redis_client.setex(f"otp:{session_id}", OTP_SESSION_EXPIRE_SECONDS, req.username)
+    except RedisError as e:
+        logger.error(e)
+        raise HTTPException(status_code=500, detail="OTP failed")
 
-        return {"otp_required": True, "session_id": session_id}
+    try:
+        twilio = get_twilio_client()
+        await run_in_threadpool(
+            lambda: twilio.verify.v2.services(TWILIO_VERIFY_SID).verifications.create(
+                to=ADMIN_PHONE, channel="sms"
+            )
+        )
     except Exception as e:
         logger.error(e)
+        try:
+            await redis_client.delete(f"otp:{session_id}")
+        except RedisError as e:
+            logger.warning(f"OTP session cleanup failed: {e}")
         raise HTTPException(status_code=500, detail="OTP failed")
 
+    return {"otp_required": True, "session_id": session_id}
+
 @api_router.post("/verify-otp")
 async def verify_otp(req: OTPVerifyRequest, session_id: str):
-    if session_id not in pending_otp_sessions:
-        raise HTTPException(status_code=400, detail="Invalid session")
-
     try:
-        twilio = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        result = twilio.verify.v2.services(TWILIO_VERIFY_SID).verification_checks.create(
-            to=ADMIN_PHONE, code=req.code
+        if not await redis_client.exists(f"otp:{session_id}"):
+            raise HTTPException(status_code=400, detail="Invalid session")
+
+        twilio = get_twilio_client()
+        result = await run_in_threadpool(
+            lambda: twilio.verify.v2.services(TWILIO_VERIFY_SID).verification_checks.create(
+                to=ADMIN_PHONE, code=req.code
+            )
         )
 
         if result.status != "approved":
             raise HTTPException(status_code=400, detail="Invalid OTP")
 
-        pending_otp_sessions.pop(session_id)
+        # getdel is atomic, so a session can only ever be redeemed once
+        if await redis_client.getdel(f"otp:{session_id}") is None:
+            raise HTTPException(status_code=400, detail="Invalid session")
+
         token = create_access_token(
             {"sub": ADMIN_USER, "is_admin": True},
             ACCESS_TOKEN_EXPIRE_MINUTES
         )
         return {"token": token}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail="OTP verification failed")
 
 @api_router.post("/admin/save")
-async def save_student(student: StudentCreate, token: str):
+async def save_student(student: StudentCreate, token: Optional[str] = Depends(request_token)):
     await get_current_admin(token)
 
     subjects = [{
@@ -177,17 +324,15 @@ async def save_student(student: StudentCreate, token: str):
         "status": get_result_status(s.grade)
     } for s in student.subjects]
 
-    await db.students.update_one(
-        {"rollNo": student.rollNo},
-        {"$set": {
-            "rollNo": student.rollNo,
-            "name": student.name,
-            "dob": student.dob,
-            "course": student.course,
-            "subjects": subjects
-        }},
-        upsert=True
-    )
+    doc = {
+        "rollNo": student.rollNo,
+        "name": student.name,
+        "dob": student.dob,
+        "course": student.course,
+        "subjects": subjects
+    }
+    await db.students.update_one({"rollNo": student.rollNo}, {"$set": doc}, upsert=True)
+    await invalidate_results([doc["rollNo"]])
 
     return {"message": "Saved successfully"}
 
@@ -195,90 +340,156 @@ async def save_student(student: StudentCreate, token: str):
 # EXCEL UPLOAD (MULTI SHEET + DOB FIX)
 # =====================
 
+def _spool_upload(src, path: str):
+    with open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+def new_excel_executor() -> ProcessPoolExecutor:
+    # spawn, not fork: forking this process (Motor, threadpool, event loop threads) can deadlock
+    return ProcessPoolExecutor(
+        max_workers=EXCEL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+async def parse_sheets_in_workers(path: str, sheets: List[str], retries: int = 1) -> List[List[dict]]:
+    global excel_executor
+    executor = excel_executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.gather(*[
+            loop.run_in_executor(executor, parse_sheet, path, sheet)
+            for sheet in sheets
+        ])
+    except BrokenProcessPool:
+        # one dead worker (e.g. OOM-killed) breaks the pool for good; swap in a fresh one,
+        # unless a concurrent upload already did
+        if excel_executor is executor:
+            executor.shutdown(wait=False)
+            excel_executor = new_excel_executor()
+        if not retries:
+            logger.error("Excel worker pool broke again on retry")
+            raise HTTPException(status_code=500, detail="Excel parsing failed")
+        logger.warning("Excel worker pool broke; retrying on a fresh pool")
+        return await parse_sheets_in_workers(path, sheets, retries - 1)
+
 @api_router.post("/admin/upload")
-async def upload_excel(file: UploadFile = File(...), token: str = None):
+async def upload_excel(file: UploadFile = File(...), token: Optional[str] = Depends(request_token)):
     await get_current_admin(token)
 
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(io.BytesIO(contents))
-
-    for sheet in workbook.sheetnames:
-        ws = workbook[sheet]
-        raw_headers = [str(c.value).strip().lower() for c in ws[1]]
-
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row or not row[0]:
-                continue
-
-            row_data = dict(zip(raw_headers, row))
-
-            # 🔹 DOB FIX (dd/mm/yyyy handled)
-            dob = row_data.get("dob", "")
-            if isinstance(dob, (int, float)):
-                dob = (datetime(1899, 12, 30) + timedelta(days=int(dob))).strftime("%Y-%m-%d")
-            elif isinstance(dob, datetime):
-                dob = dob.strftime("%Y-%m-%d")
-            elif isinstance(dob, str):
-                dob = dob.strip()
-                try:
-                    dob = datetime.strptime(dob, "%d/%m/%Y").strftime("%Y-%m-%d")
-                except ValueError:
-                    dob = dob
-            else:
-                dob = ""
-
-            subjects = []
-            for i in range(1, 26):
-                sem = row_data.get(f"subjectsemester{i}")
-                code = row_data.get(f"subjectcode{i}")
-                grade = row_data.get(f"subjectgrade{i}")
-
-                if sem and code and grade:
-                    subjects.append({
-                        "semester": str(sem),
-                        "code": str(code),
-                        "grade": str(grade),
-                        "status": get_result_status(str(grade))
-                    })
-
-            await db.students.update_one(
-                {"rollNo": str(row_data.get("rollno"))},
-                {"$set": {
-                    "rollNo": str(row_data.get("rollno")),
-                    "name": str(row_data.get("name")),
-                    "dob": dob,
-                    "course": str(row_data.get("course")),
-                    "subjects": subjects
-                }},
-                upsert=True
-            )
+    # xlsx is a zip archive; reject anything else before openpyxl tries to parse it
+    head = await file.read(len(XLSX_MAGIC))
+    if head != XLSX_MAGIC:
+        raise HTTPException(status_code=400, detail="Not an xlsx file")
+
+    await file.seek(0)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        # workers need a path; copy Starlette's spooled upload there off the event loop
+        await run_in_threadpool(_spool_upload, file.file, path)
+
+        # parsing is CPU-bound; sheets are independent, so fan them out across processes.
+        # A single sheet stays in-thread: a worker would only add pickling the rows back.
+        sheets = await run_in_threadpool(sheet_names, path)
+        if len(sheets) == 1:
+            parsed = [await run_in_threadpool(parse_sheet, path, sheets[0])]
+        else:
+            parsed = await parse_sheets_in_workers(path, sheets)
+    finally:
+        os.unlink(path)
+
+    students = [doc for sheet_students in parsed for doc in sheet_students]
+
+    for i in range(0, len(students), BULK_WRITE_BATCH_SIZE):
+        batch = students[i:i + BULK_WRITE_BATCH_SIZE]
+        await db.students.bulk_write(
+            [UpdateOne({"rollNo": doc["rollNo"]}, {"$set": doc}, upsert=True) for doc in batch],
+            ordered=False
+        )
+        await invalidate_results([doc["rollNo"] for doc in batch])
 
     return {"message": "Excel uploaded successfully"}
 
 @api_router.get("/student/result")
 async def get_result(rollNo: str, dob: str):
-    student = await db.students.find_one({"rollNo": rollNo, "dob": dob}, {"_id": 0})
+    cached_body = await get_cached_result(rollNo, dob)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+
+    student = await db.students.find_one(
+        {"rollNo": rollNo, "dob": dob},
+        STUDENT_RESULT_PROJECTION,
+        hint=STUDENT_LOOKUP_INDEX
+    )
     if not student:
         return {"message": "No result found"}
 
-    return {
-        "rollNo": student["rollNo"],
-        "name": student["name"],
-        "course": student["course"],
-        "dob": student["dob"],
-        "results": student["subjects"]
-    }
+    await cache_result(student)
+
+    return result_response(student)
 
 @api_router.get("/verify-token")
-async def verify_admin(token: str):
+async def verify_admin(token: Optional[str] = Depends(request_token)):
     return {"valid": bool(verify_token(token))}
 
+# Sub-requests /batch can run, as (method, path) -> handler(body, query).
+# Limited to the cheap warm-up routes; anything else is a 404 sub-response.
+BATCH_ROUTES = {
+    ("GET", "/health"): lambda body, query: health(),
+    ("POST", "/login"): lambda body, query: admin_login(LoginRequest(**body)),
+    ("GET", "/verify-token"): lambda body, query: verify_admin(query.get("token")),
+}
+
+@api_router.post("/batch")
+async def batch(sub_requests: List[BatchSubRequest]):
+    # several calls in one round-trip; sub-requests run in order
+    if len(sub_requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} sub-requests")
+
+    responses = []
+    issued_token = None
+    for sub in sub_requests:
+        handler = BATCH_ROUTES.get((sub.method.upper(), sub.url))
+        if handler is None:
+            responses.append({"status": 404, "body": {"detail": "Not Found"}})
+            continue
+
+        query = dict(sub.query or {})
+        # a null token stands for the one issued by an earlier login in this batch
+        if "token" in query and query["token"] is None:
+            query["token"] = issued_token
+
+        try:
+            status, body = 200, await handler(sub.body or {}, query)
+        except HTTPException as e:
+            status, body = e.status_code, {"detail": e.detail}
+        except ValidationError:
+            status, body = 422, {"detail": "Invalid request body"}
+
+        if status == 200 and body.get("token"):
+            issued_token = body["token"]
+        responses.append({"status": status, "body": body})
+
+    return responses
+
 # =====================
 # FINAL
 # =====================
 
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def startup():
+    global excel_executor
+    excel_executor = new_excel_executor()
+
+    await db.students.create_index([("rollNo", 1)], unique=True)
+    await db.students.create_index(STUDENT_LOOKUP_INDEX, unique=True)
+
 @app.on_event("shutdown")
 async def shutdown():
     client.close()
+    await redis_client.aclose()
+    if excel_executor:
+        excel_executor.shutdown()
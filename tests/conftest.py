@@ -0,0 +1,55 @@
+import functools
+import os
+
+import orjson
+import pytest
+import requests
+
+BASE_URL = os.environ.get("BACKEND_URL", "https://gradeview-3.preview.emergentagent.com")
+# (connect, read) seconds, applied to every request made through the http fixture
+REQUEST_TIMEOUT = (5, 10)
+
+
+@pytest.fixture(scope="session")
+def http():
+    """Keep-alive session shared by every test in this worker"""
+    with requests.Session() as session:
+        session.request = functools.partial(session.request, timeout=REQUEST_TIMEOUT)
+        yield session
+
+
+@pytest.fixture(scope="session")
+def api_url(http):
+    """API root; skips the suite when the backend is not reachable"""
+    url = f"{BASE_URL}/api"
+    try:
+        http.get(f"{url}/")
+    except requests.ConnectionError as e:
+        pytest.skip(f"Backend not reachable at {url}: {e}")
+    return url
+
+
+@pytest.fixture(scope="session")
+def admin_token(http, api_url):
+    """Logs in once per worker and returns the admin token"""
+    response = http.post(
+        f"{api_url}/login",
+        json={"username": "admin", "password": "12345"}
+    )
+    assert response.status_code == 200, f"Status: {response.status_code}"
+    data = orjson.loads(response.content)
+    assert data.get("otp_required") is False and "token" in data, "Token not received or OTP required"
+    return data["token"]
+
+
+@pytest.fixture(scope="session")
+def auth_headers(admin_token):
+    """Authorization header carrying the admin token"""
+    return {"Authorization": f"Bearer {admin_token}"}
+
+
+@pytest.fixture(scope="session")
+def roll_no():
+    """Per-worker roll number so parallel save/get tests don't collide"""
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "master")
+    return f"TEST-{worker_id}-001"
@@ -0,0 +1,103 @@
+"""Backend API tests, runnable in parallel with `pytest -n auto --dist=load`
+
+Save/get tests use a per-worker roll number, so they are safe to spread across workers.
+"""
+
+import orjson
+import pytest
+
+PASS_GRADES = frozenset({"O", "A+", "A", "B+", "B", "C"})
+
+
+def student_payload(roll_no):
+    return {
+        "rollNo": roll_no,
+        "name": "Test Student",
+        "dob": "2000-01-01",
+        "course": "B.E. Computer Science Engineering",
+        "subjects": [
+            {"code": "CS101", "semester": "1", "grade": "A"},
+            {"code": "CS102", "semester": "1", "grade": "B+"},
+            {"code": "CS103", "semester": "1", "grade": "F"}
+        ]
+    }
+
+
+@pytest.fixture(scope="module")
+def save_response(http, api_url, auth_headers, roll_no):
+    """Saves this worker's student once; shared by the save and get tests"""
+    return http.post(
+        f"{api_url}/admin/save",
+        headers=auth_headers,
+        json=student_payload(roll_no)
+    )
+
+
+def test_health_check(http, api_url):
+    """Test basic API health"""
+    response = http.get(f"{api_url}/health")
+    assert response.status_code == 200
+
+
+def test_admin_login(admin_token):
+    """Test admin login with correct credentials"""
+    assert admin_token
+
+
+def test_admin_login_invalid(http, api_url):
+    """Test admin login with invalid credentials"""
+    response = http.post(
+        f"{api_url}/login",
+        json={"username": "wrong", "password": "wrong"}
+    )
+    assert response.status_code == 401
+
+
+def test_protected_route_without_token(http, api_url, roll_no):
+    """Test protected route without token"""
+    payload = student_payload(roll_no)
+    payload["subjects"] = payload["subjects"][:1]
+    response = http.post(f"{api_url}/admin/save", json=payload)
+    assert response.status_code == 401
+
+
+def test_save_student_result(save_response):
+    """Test saving student result"""
+    assert save_response.status_code == 200
+    assert orjson.loads(save_response.content).get("message") == "Saved successfully"
+
+
+def test_get_student_result(http, api_url, roll_no, save_response):
+    """Test retrieving student result and its Pass/Fail logic"""
+    assert save_response.status_code == 200, f"Save failed with status {save_response.status_code}"
+    response = http.get(
+        f"{api_url}/student/result",
+        params={"rollNo": roll_no, "dob": "2000-01-01"}
+    )
+    assert response.status_code == 200
+
+    data = orjson.loads(response.content)
+    assert data.get("rollNo") == roll_no, "Student data not found or incorrect"
+    for subject in data.get("results", []):
+        expected_status = "Pass" if subject.get("grade", "").upper() in PASS_GRADES else "Fail"
+        assert subject.get("status") == expected_status, "Pass/Fail logic incorrect"
+
+
+def test_get_nonexistent_student(http, api_url):
+    """Test retrieving non-existent student result"""
+    response = http.get(
+        f"{api_url}/student/result",
+        params={"rollNo": "NONEXISTENT", "dob": "1999-01-01"}
+    )
+    assert response.status_code == 200
+    assert "No result found" in orjson.loads(response.content).get("message", "")
+
+
+def test_token_verification(http, api_url, auth_headers):
+    """Test token verification endpoint"""
+    response = http.get(
+        f"{api_url}/verify-token",
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert orjson.loads(response.content).get("valid") is True